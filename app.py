@@ -4,22 +4,46 @@ Validates CTFd tokens and manages Docker containers for teams
 """
 
 import os
+import time
 import logging
-from flask import Flask, request, jsonify
+
+_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
 from functools import wraps
 import requests
 from docker_manager import DockerManager
+from challenge_store import ChallengeStore
+from bulkhead import create_lanes
+from resource_gc import ResourceCollector
+from session_tokens import SessionSigner, keys_from_env
 
 # Configuration
 CTFD_URL = os.environ.get('CTFD_URL', 'https://2k26-rsuctf.nullbytez.live')
 WEBSHELL_BASE_URL = os.environ.get('WEBSHELL_BASE_URL', 'https://webshell.nullbytez.live')
 CONTAINER_NETWORK = os.environ.get('CONTAINER_NETWORK', 'webshell-network')
+CONTAINER_NETWORK_SHARDS = int(os.environ.get('CONTAINER_NETWORK_SHARDS', '1'))
+CONTAINER_NETWORK_SHARD_SUBNET = os.environ.get('CONTAINER_NETWORK_SHARD_SUBNET', '')
+CONTAINER_NETWORK_SHARD_PREFIX = int(os.environ.get('CONTAINER_NETWORK_SHARD_PREFIX', '24'))
+PROXY_CONTAINERS = [
+    name.strip() for name in os.environ.get('PROXY_CONTAINERS', '').split(',') if name.strip()
+]
 CONTAINER_IMAGE = os.environ.get('CONTAINER_IMAGE', 'webshell-instance:latest')
 CONTAINER_MEMORY_LIMIT = os.environ.get('CONTAINER_MEMORY_LIMIT', '512m')
 CONTAINER_CPU_LIMIT = float(os.environ.get('CONTAINER_CPU_LIMIT', '0.5'))
 CONTAINER_TIMEOUT_HOURS = int(os.environ.get('CONTAINER_TIMEOUT_HOURS', '24'))
 API_SECRET = os.environ.get('API_SECRET', 'change-me-in-production')
+DOCKER_API_VERSION = os.environ.get('DOCKER_API_VERSION', 'auto')
+CHALLENGE_VOLUME = os.environ.get('CHALLENGE_VOLUME', 'webshell-challenges')
+CHALLENGE_STORE_PATH = os.environ.get('CHALLENGE_STORE_PATH', '/srv/challenges')
+CHALLENGE_SOURCE_DIR = os.environ.get('CHALLENGE_SOURCE_DIR', '/app/Challenges-Files')
+GC_MIN_AGE_MINUTES = int(os.environ.get('GC_MIN_AGE_MINUTES', '30'))
+GC_BATCH_SIZE = int(os.environ.get('GC_BATCH_SIZE', '10'))
+GC_MAX_REMOVALS = int(os.environ.get('GC_MAX_REMOVALS', '100'))
+SESSION_KEYS = os.environ.get('SESSION_KEYS', '')
+SESSION_TTL_SECONDS = int(os.environ.get('SESSION_TTL_SECONDS', '3600'))
+REQUIRE_SESSION_TOKEN = os.environ.get('REQUIRE_SESSION_TOKEN', 'true').lower() == 'true'
 
 # Setup logging
 logging.basicConfig(
@@ -32,16 +56,44 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app, origins=['*'])  # Configure appropriately for production
 
-# Initialize Docker manager
+# Initialize Docker manager (no Docker I/O until first use; network setup
+# runs once in the gunicorn master, see gunicorn.conf.py)
 docker_mgr = DockerManager(
     network_name=CONTAINER_NETWORK,
     image_name=CONTAINER_IMAGE,
     memory_limit=CONTAINER_MEMORY_LIMIT,
     cpu_limit=CONTAINER_CPU_LIMIT,
     timeout_hours=CONTAINER_TIMEOUT_HOURS,
-    webshell_base_url=WEBSHELL_BASE_URL
+    webshell_base_url=WEBSHELL_BASE_URL,
+    api_version=DOCKER_API_VERSION,
+    challenge_volume=CHALLENGE_VOLUME,
+    network_shards=CONTAINER_NETWORK_SHARDS,
+    proxy_containers=PROXY_CONTAINERS,
+    shard_subnet=CONTAINER_NETWORK_SHARD_SUBNET or None,
+    shard_prefix=CONTAINER_NETWORK_SHARD_PREFIX,
+    lazy=True
 )
 
+# Challenge files are published into the shared volume, not the image
+challenge_store = ChallengeStore(CHALLENGE_STORE_PATH)
+
+# Orphaned container / volume collector
+resource_gc = ResourceCollector(
+    docker_mgr,
+    min_age_minutes=GC_MIN_AGE_MINUTES,
+    batch_size=GC_BATCH_SIZE,
+    max_removals=GC_MAX_REMOVALS
+)
+
+# Session tokens issued by /api/validate-token
+session_signer = SessionSigner(
+    keys_from_env(SESSION_KEYS, API_SECRET),
+    ttl_seconds=SESSION_TTL_SECONDS
+)
+
+# Per-lane concurrency budgets; /health is deliberately outside every lane
+lanes = create_lanes()
+
 
 def validate_ctfd_token(token):
     """
@@ -124,6 +176,75 @@ def sanitize_team_name(team_name):
     return sanitized[:50] if sanitized else 'team'
 
 
+def lane(name):
+    """
+    Run the endpoint inside a request lane
+    Returns 503 when the lane and its queue are full
+    """
+    bulkhead = lanes[name]
+    
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if not bulkhead.acquire():
+                logger.warning(f"Lane {name} saturated, rejecting {request.path}")
+                return jsonify({
+                    'success': False,
+                    'error': 'Server busy, please retry'
+                }), 503, {'Retry-After': '1'}
+            try:
+                return f(*args, **kwargs)
+            finally:
+                bulkhead.release()
+        return wrapper
+    return decorator
+
+
+def require_admin(f):
+    """
+    Check the X-API-Secret header
+    Applied outside lane() so unauthenticated calls never take an admin slot
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        auth = request.headers.get('X-API-Secret')
+        if auth != API_SECRET:
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        return f(*args, **kwargs)
+    return wrapper
+
+
+def session_team(f):
+    """
+    Resolve the caller's team from the Authorization: Bearer session token
+    Verified locally, no CTFd call; sets g.session_team (sanitized name).
+    Without a token the request is rejected unless REQUIRE_SESSION_TOKEN is
+    off, in which case the endpoint falls back to team_name in the body
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        auth = request.headers.get('Authorization', '')
+        token = auth[7:].strip() if auth.startswith('Bearer ') else ''
+        g.session_team = None
+        
+        if token:
+            claims = session_signer.verify(token)
+            if not claims:
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid or expired session'
+                }), 401
+            g.session_team = claims['team']
+        elif REQUIRE_SESSION_TOKEN:
+            return jsonify({
+                'success': False,
+                'error': 'Session token is required'
+            }), 401
+        
+        return f(*args, **kwargs)
+    return wrapper
+
+
 # ============== API Endpoints ==============
 
 @app.route('/health', methods=['GET'])
@@ -136,6 +257,7 @@ def health_check():
 
 
 @app.route('/api/validate-token', methods=['POST'])
+@lane('validate')
 def api_validate_token():
     """
     Validate a CTFd token and return user/team information
@@ -153,12 +275,19 @@ def api_validate_token():
         result = validate_ctfd_token(token)
         
         if result:
+            session_token, session_expires_at = session_signer.issue(
+                result['user_id'],
+                result['team_id'],
+                sanitize_team_name(result['team_name'])
+            )
             return jsonify({
                 'success': True,
                 'user_id': result['user_id'],
                 'username': result['username'],
                 'team_id': result['team_id'],
-                'team_name': result['team_name']
+                'team_name': result['team_name'],
+                'session_token': session_token,
+                'session_expires_at': session_expires_at
             })
         else:
             return jsonify({
@@ -175,13 +304,15 @@ def api_validate_token():
 
 
 @app.route('/api/status', methods=['POST'])
+@session_team
+@lane('read')
 def api_status():
     """
     Check the status of a team's webshell container
     """
     try:
-        data = request.get_json()
-        team_name = data.get('team_name', '').strip()
+        data = request.get_json(silent=True) or {}
+        team_name = g.session_team or data.get('team_name', '').strip()
         
         if not team_name:
             return jsonify({
@@ -216,13 +347,15 @@ def api_status():
 
 
 @app.route('/api/create', methods=['POST'])
+@session_team
+@lane('mutate')
 def api_create():
     """
     Create a new webshell container for a team
     """
     try:
-        data = request.get_json()
-        team_name = data.get('team_name', '').strip()
+        data = request.get_json(silent=True) or {}
+        team_name = g.session_team or data.get('team_name', '').strip()
         username = data.get('username', '').strip()
         
         if not team_name:
@@ -285,13 +418,15 @@ def api_create():
 
 
 @app.route('/api/delete', methods=['POST'])
+@session_team
+@lane('mutate')
 def api_delete():
     """
     Stop and remove a team's webshell container
     """
     try:
-        data = request.get_json()
-        team_name = data.get('team_name', '').strip()
+        data = request.get_json(silent=True) or {}
+        team_name = g.session_team or data.get('team_name', '').strip()
         
         if not team_name:
             return jsonify({
@@ -323,15 +458,13 @@ def api_delete():
 
 
 @app.route('/api/admin/list', methods=['GET'])
+@require_admin
+@lane('admin')
 def api_admin_list():
     """
     Admin endpoint: List all active containers
     Requires API_SECRET header
     """
-    auth = request.headers.get('X-API-Secret')
-    if auth != API_SECRET:
-        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
-    
     try:
         containers = docker_mgr.list_all_containers()
         return jsonify({
@@ -347,15 +480,13 @@ def api_admin_list():
 
 
 @app.route('/api/admin/cleanup', methods=['POST'])
+@require_admin
+@lane('admin')
 def api_admin_cleanup():
     """
     Admin endpoint: Cleanup expired containers
     Requires API_SECRET header
     """
-    auth = request.headers.get('X-API-Secret')
-    if auth != API_SECRET:
-        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
-    
     try:
         result = docker_mgr.cleanup_expired_containers()
         return jsonify({
@@ -371,6 +502,73 @@ def api_admin_cleanup():
         }), 500
 
 
+@app.route('/api/admin/gc', methods=['POST'])
+@require_admin
+@lane('admin')
+def api_admin_gc():
+    """
+    Admin endpoint: Remove orphaned webshell containers and volumes
+    Pass {"dry_run": true} to only report what would be removed
+    Requires API_SECRET header
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        result = resource_gc.collect(dry_run=bool(data.get('dry_run', False)))
+        if not result.get('success', True):
+            return jsonify(result), 409
+        return jsonify({
+            'success': True,
+            **result
+        })
+    except Exception as e:
+        logger.error(f"Error in gc: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+
+@app.route('/api/admin/lanes', methods=['GET'])
+@require_admin
+def api_admin_lanes():
+    """
+    Admin endpoint: Request lane saturation metrics for this worker
+    Not itself in a lane, so it answers while the admin lane is full
+    Requires API_SECRET header
+    """
+    return jsonify({
+        'success': True,
+        'worker_pid': os.getpid(),
+        'lanes': {name: bulkhead.stats() for name, bulkhead in lanes.items()}
+    })
+
+
+@app.route('/api/admin/challenges/sync', methods=['POST'])
+@require_admin
+@lane('admin')
+def api_admin_challenges_sync():
+    """
+    Admin endpoint: Publish challenge files to all containers
+    Copies only changed files, then swaps the current revision atomically
+    Requires API_SECRET header
+    """
+    try:
+        result = challenge_store.sync(CHALLENGE_SOURCE_DIR)
+        if result['success']:
+            return jsonify(result)
+        return jsonify(result), 500
+    except Exception as e:
+        logger.error(f"Error syncing challenge files: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error'
+        }), 500
+
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+logger.info(f"App imported in {IMPORT_SECONDS * 1000:.1f} ms")
+
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('DEBUG', 'false').lower() == 'true'
@@ -379,4 +577,6 @@ if __name__ == '__main__':
     logger.info(f"CTFd URL: {CTFD_URL}")
     logger.info(f"Webshell Base URL: {WEBSHELL_BASE_URL}")
     
+    docker_mgr.prepare()
+    
     app.run(host='0.0.0.0', port=port, debug=debug)
@@ -0,0 +1,98 @@
+"""
+Request lane load test for the Webshell API
+Measures /api/status latency on its own, then again while a storm of
+/api/create calls runs; with lanes in place status p99 should stay flat
+and surplus creates should get fast 503s instead of queueing
+
+Usage: python benchmarks/lanes_loadtest.py http://localhost:5000 [--storm 64]
+Creates real containers named loadtest-<n>; they are deleted afterwards.
+Teams come from the request body, so run it against a test deployment with
+REQUIRE_SESSION_TOKEN=false
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from collections import Counter
+
+import requests
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def probe_status(base_url, duration, headers):
+    """Sequential status checks for duration seconds, returns latencies in ms"""
+    latencies = []
+    session = requests.Session()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        session.post(f'{base_url}/api/status', json={'team_name': 'loadtest-probe'},
+                     headers=headers, timeout=30)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def create_storm(base_url, count, headers, codes, stop):
+    def create(n):
+        while not stop.is_set():
+            try:
+                response = requests.post(
+                    f'{base_url}/api/create',
+                    json={'team_name': f'loadtest-{n}', 'username': 'loadtest'},
+                    headers=headers,
+                    timeout=120
+                )
+                codes[response.status_code] += 1
+            except requests.RequestException:
+                codes['error'] += 1
+
+    threads = [threading.Thread(target=create, args=(n,), daemon=True) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def report(label, latencies):
+    print(f"{label:>12}: n={len(latencies)} p50={statistics.median(latencies):.1f} ms "
+          f"p99={percentile(latencies, 99):.1f} ms max={max(latencies):.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('base_url')
+    parser.add_argument('--storm', type=int, default=64, help='Concurrent create clients')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds per phase')
+    parser.add_argument('--secret', help='API_SECRET, to print lane metrics')
+    args = parser.parse_args()
+    base_url = args.base_url.rstrip('/')
+    headers = {}
+
+    report('baseline', probe_status(base_url, args.duration, headers))
+
+    codes = Counter()
+    stop = threading.Event()
+    threads = create_storm(base_url, args.storm, headers, codes, stop)
+    report('under storm', probe_status(base_url, args.duration, headers))
+    stop.set()
+    for thread in threads:
+        thread.join()
+    print(f"create responses: {dict(codes)}")
+
+    if args.secret:
+        lanes = requests.get(f'{base_url}/api/admin/lanes',
+                             headers={'X-API-Secret': args.secret}, timeout=10).json()
+        for name, stats in lanes.get('lanes', {}).items():
+            print(f"lane {name}: {stats}")
+
+    for n in range(args.storm):
+        requests.post(f'{base_url}/api/delete', json={'team_name': f'loadtest-{n}'},
+                      headers=headers, timeout=120)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Network connect latency vs shard count
+For each shard count, starts throwaway containers, spreads them over that
+many bridge networks, and times each network connect (veth + bridge attach)
+
+Usage: python benchmarks/network_shards.py --shards 1 4 16 --containers 64
+Needs access to the Docker socket; everything it creates is removed
+"""
+
+import argparse
+import statistics
+import time
+
+import docker
+
+LABEL = 'webshell.benchmark'
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(client, shard_count, container_count, image):
+    networks = [
+        client.networks.create(f'webshell-bench-{shard_count}-{i}', driver='bridge', labels={LABEL: '1'})
+        for i in range(shard_count)
+    ]
+    containers = []
+    latencies = []
+    try:
+        for n in range(container_count):
+            container = client.containers.run(
+                image, ['sleep', '3600'], detach=True, labels={LABEL: '1'}
+            )
+            containers.append(container)
+            network = networks[n % shard_count]
+            started = time.perf_counter()
+            network.connect(container)
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        for container in containers:
+            container.remove(force=True)
+        for network in networks:
+            network.remove()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--containers', type=int, default=64)
+    parser.add_argument('--image', default='busybox:latest')
+    args = parser.parse_args()
+
+    client = docker.from_env()
+    client.images.pull(args.image)
+    for shard_count in args.shards:
+        latencies = run(client, shard_count, args.containers, args.image)
+        print(f"shards={shard_count:>3}: connect p50={statistics.median(latencies):.1f} ms "
+              f"p99={percentile(latencies, 99):.1f} ms max={max(latencies):.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
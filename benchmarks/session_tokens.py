@@ -0,0 +1,45 @@
+"""
+Session token overhead benchmark
+Times SessionSigner.verify on its own, then /api/status through the Flask
+test client with and without a session token. The Docker lookup is replaced
+by a no-op so only the auth overhead differs between the two runs
+
+Usage: python benchmarks/session_tokens.py [iterations]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('API_SECRET', 'benchmark-secret')
+
+import app  # noqa: E402
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    token, _ = app.session_signer.issue(123, 45, 'hackersquad')
+
+    verify = timeit.timeit(lambda: app.session_signer.verify(token), number=iterations)
+    print(f"verify:                 {verify / iterations * 1e6:.1f} us/op")
+
+    app.docker_mgr.get_container_status = lambda team_name: None
+    client = app.app.test_client()
+
+    app.REQUIRE_SESSION_TOKEN = False
+    unauthenticated = timeit.timeit(
+        lambda: client.post('/api/status', json={'team_name': 'HackerSquad'}),
+        number=iterations // 10
+    )
+    authenticated = timeit.timeit(
+        lambda: client.post('/api/status', json={},
+                            headers={'Authorization': f'Bearer {token}'}),
+        number=iterations // 10
+    )
+    print(f"/api/status body team:  {unauthenticated / (iterations // 10) * 1e6:.1f} us/op")
+    print(f"/api/status with token: {authenticated / (iterations // 10) * 1e6:.1f} us/op")
+
+
+if __name__ == '__main__':
+    main()
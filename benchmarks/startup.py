@@ -0,0 +1,54 @@
+"""
+Startup benchmark for the Webshell API
+Measures app import time and time to first /health response in a fresh
+interpreter (what a gunicorn worker pays without preload)
+
+Usage: python benchmarks/startup.py [runs]
+"""
+
+import os
+import subprocess
+import sys
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/health')
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+print(f"{imported - started} {served - started}")
+'''
+
+
+def run_once():
+    """Return (import_seconds, first_request_seconds) for one cold start"""
+    # Point at a dead socket: startup must not depend on Docker
+    env = dict(os.environ, DOCKER_HOST='unix:///nonexistent/docker.sock')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout.split()
+    return float(output[0]), float(output[1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    samples = [run_once() for _ in range(runs)]
+    imports = [s[0] * 1000 for s in samples]
+    firsts = [s[1] * 1000 for s in samples]
+    print(f"runs: {runs}")
+    print(f"import:        median {statistics.median(imports):.1f} ms, max {max(imports):.1f} ms")
+    print(f"first /health: median {statistics.median(firsts):.1f} ms, max {max(firsts):.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
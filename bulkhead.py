@@ -0,0 +1,137 @@
+"""
+Request Lanes (Bulkheads) for the Webshell API
+Each class of endpoint gets its own concurrency budget and wait queue, so
+slow Docker writes cannot take every worker thread away from cheap reads
+"""
+
+import os
+import threading
+import time
+
+# lane -> (concurrent limit, queue depth), per gunicorn worker process
+DEFAULT_LANES = {
+    'read': (8, 16),        # /api/status
+    'validate': (4, 8),     # /api/validate-token (CTFd round trips)
+    'mutate': (2, 4),       # /api/create, /api/delete (Docker writes)
+    'admin': (2, 2),        # /api/admin/* (list, cleanup, gc, sync)
+}
+
+# Threads kept free of every lane so /health is always answered
+RESERVED_THREADS = 2
+
+
+class Bulkhead:
+    """
+    Concurrency limit with a bounded wait queue
+    Requests beyond limit + queue_depth, or that wait longer than
+    queue_timeout, are rejected instead of piling up
+    """
+
+    def __init__(self, name, limit, queue_depth, queue_timeout=5.0):
+        self.name = name
+        self.limit = limit
+        self.queue_depth = queue_depth
+        self.queue_timeout = queue_timeout
+
+        self._cond = threading.Condition()
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_in_flight = 0
+        self.peak_waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_wait = 0.0
+
+    def acquire(self):
+        """Take a slot; returns False if the lane is saturated"""
+        with self._cond:
+            if self.in_flight < self.limit:
+                self._admit(0.0)
+                return True
+
+            if self.waiting >= self.queue_depth:
+                self.rejected += 1
+                return False
+
+            self.waiting += 1
+            self.queued += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            started = time.monotonic()
+            deadline = started + self.queue_timeout
+            try:
+                while self.in_flight >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+            self._admit(time.monotonic() - started)
+            return True
+
+    def _admit(self, waited):
+        self.in_flight += 1
+        self.admitted += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.max_wait = max(self.max_wait, waited)
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def stats(self):
+        """Snapshot of lane usage and saturation"""
+        with self._cond:
+            return {
+                'limit': self.limit,
+                'queue_depth': self.queue_depth,
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'saturation': round(self.in_flight / self.limit, 3) if self.limit else 1.0,
+                'queue_saturation': round(self.waiting / self.queue_depth, 3) if self.queue_depth else 0.0,
+                'peak_in_flight': self.peak_in_flight,
+                'peak_waiting': self.peak_waiting,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'max_wait_ms': round(self.max_wait * 1000, 1)
+            }
+
+
+def lane_config():
+    """
+    Lane limits from the environment
+    LANE_<NAME>=<limit>:<queue depth>, e.g. LANE_MUTATE=2:4
+    """
+    config = {}
+    for name, (limit, queue_depth) in DEFAULT_LANES.items():
+        value = os.environ.get(f'LANE_{name.upper()}')
+        if value:
+            limit, _, queue_depth = value.partition(':')
+            limit = int(limit)
+            queue_depth = int(queue_depth or 0)
+        config[name] = (limit, queue_depth)
+    return config
+
+
+def create_lanes():
+    """Build one Bulkhead per configured lane"""
+    queue_timeout = float(os.environ.get('LANE_QUEUE_TIMEOUT', '5'))
+    return {
+        name: Bulkhead(name, limit, queue_depth, queue_timeout)
+        for name, (limit, queue_depth) in lane_config().items()
+    }
+
+
+def required_threads():
+    """
+    Worker threads needed so every admitted or queued request holds its own
+    thread and RESERVED_THREADS stay free for /health
+    """
+    return sum(limit + queue_depth for limit, queue_depth in lane_config().values()) + RESERVED_THREADS
@@ -0,0 +1,301 @@
+"""
+Content-Addressed Challenge File Store
+Publishes challenge files into a shared volume mounted read-only by every
+webshell container, so files can change without rebuilding the image
+
+Store layout (volume root):
+    objects/ab/ab12...      one blob per unique file content (sha256)
+    objects/ab/ab12...-x    same, executable variant (hard links share a mode)
+    revisions/<rev>/...     challenge tree, hard links into objects/
+    revisions/<rev>.json    manifest: relative path -> object id
+    current -> revisions/<rev>
+
+Containers see /challenges -> <mount>/current, so swapping the symlink
+publishes a new revision to running containers without a restart
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+logger = logging.getLogger(__name__)
+
+
+class ChallengeStore:
+    """
+    Syncs a challenge source directory into a content-addressed store
+    Only files whose content is not already stored are copied
+    """
+
+    CURRENT_LINK = 'current'
+    OBJECTS_DIR = 'objects'
+    REVISIONS_DIR = 'revisions'
+    INDEX_FILE = '.index.json'
+    LOCK_FILE = '.lock'
+
+    FILE_MODE = 0o644
+    EXEC_MODE = 0o755
+    DIR_MODE = 0o755
+    EXEC_SUFFIX = '-x'
+
+    def __init__(self, store_path='/srv/challenges', keep_revisions=3):
+        self.store_path = store_path
+        self.keep_revisions = keep_revisions
+        self.objects_path = os.path.join(store_path, self.OBJECTS_DIR)
+        self.revisions_path = os.path.join(store_path, self.REVISIONS_DIR)
+
+    def _object_path(self, object_id):
+        """Path of the blob for an object id (digest plus mode suffix)"""
+        return os.path.join(self.objects_path, object_id[:2], object_id)
+
+    @staticmethod
+    def _is_executable(path, mode):
+        """
+        Keep the source's executable bit; otherwise follow the rule the image
+        build used to apply (everything 755 except zip archives)
+        """
+        return bool(mode & 0o111) or not path.lower().endswith('.zip')
+
+    def _load_index(self):
+        """Load the (size, mtime) -> digest cache from the last sync"""
+        try:
+            with open(os.path.join(self.store_path, self.INDEX_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index):
+        path = os.path.join(self.store_path, self.INDEX_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _hash_file(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _scan(self, source_dir, index):
+        """
+        Build the manifest for a source tree
+        Files unchanged since the last sync (same size and mtime) reuse the
+        cached digest instead of being re-hashed
+        """
+        manifest = {}
+        new_index = {}
+
+        for root, dirs, files in os.walk(source_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                rel_path = os.path.relpath(path, source_dir)
+                stat = os.stat(path)
+                key = f"{stat.st_size}:{stat.st_mtime_ns}"
+
+                cached = index.get(rel_path)
+                if cached and cached[0] == key:
+                    digest = cached[1]
+                else:
+                    digest = self._hash_file(path)
+
+                object_id = digest
+                if self._is_executable(path, stat.st_mode):
+                    object_id += self.EXEC_SUFFIX
+
+                manifest[rel_path] = object_id
+                new_index[rel_path] = [key, digest]
+
+        return manifest, new_index
+
+    def _store_object(self, source_path, object_id):
+        """Copy a file into objects/ unless it is already stored"""
+        object_path = self._object_path(object_id)
+        if os.path.exists(object_path):
+            return False
+
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = f"{object_path}.tmp"
+        shutil.copyfile(source_path, tmp_path)
+        mode = self.EXEC_MODE if object_id.endswith(self.EXEC_SUFFIX) else self.FILE_MODE
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, object_path)
+        return True
+
+    def _build_revision(self, revision, manifest):
+        """Materialize a revision tree as hard links into objects/"""
+        revision_path = os.path.join(self.revisions_path, revision)
+        if os.path.isdir(revision_path):
+            return
+
+        tmp_path = f"{revision_path}.tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path, mode=self.DIR_MODE)
+
+        for rel_path, object_id in manifest.items():
+            target = os.path.join(tmp_path, rel_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.link(self._object_path(object_id), target)
+
+        for root, dirs, _ in os.walk(tmp_path):
+            for name in dirs:
+                os.chmod(os.path.join(root, name), self.DIR_MODE)
+        os.chmod(tmp_path, self.DIR_MODE)
+
+        with open(f"{revision_path}.json", 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, revision_path)
+
+    def _activate(self, revision):
+        """Atomically point current/ at a revision"""
+        link_path = os.path.join(self.store_path, self.CURRENT_LINK)
+        tmp_link = f"{link_path}.tmp"
+        if os.path.lexists(tmp_link):
+            os.unlink(tmp_link)
+        # Relative target so the link resolves wherever the volume is mounted
+        os.symlink(os.path.join(self.REVISIONS_DIR, revision), tmp_link)
+        os.replace(tmp_link, link_path)
+        # Revision age is tracked by mtime for pruning
+        os.utime(os.path.join(self.revisions_path, revision))
+
+    def current_revision(self):
+        """Return the active revision id, or None before the first sync"""
+        link_path = os.path.join(self.store_path, self.CURRENT_LINK)
+        try:
+            return os.path.basename(os.readlink(link_path))
+        except OSError:
+            return None
+
+    def _prune(self, active):
+        """Drop old revisions and blobs no kept revision references"""
+        revisions = [
+            name for name in os.listdir(self.revisions_path)
+            if os.path.isdir(os.path.join(self.revisions_path, name))
+            and not name.endswith('.tmp')
+        ]
+        revisions.sort(
+            key=lambda name: os.path.getmtime(os.path.join(self.revisions_path, name)),
+            reverse=True
+        )
+        kept = [active] + [r for r in revisions if r != active][:max(self.keep_revisions - 1, 0)]
+
+        removed_revisions = []
+        for revision in revisions:
+            if revision in kept:
+                continue
+            shutil.rmtree(os.path.join(self.revisions_path, revision), ignore_errors=True)
+            try:
+                os.unlink(os.path.join(self.revisions_path, f"{revision}.json"))
+            except FileNotFoundError:
+                pass
+            removed_revisions.append(revision)
+
+        referenced = set()
+        for revision in kept:
+            try:
+                with open(os.path.join(self.revisions_path, f"{revision}.json")) as f:
+                    referenced.update(json.load(f).values())
+            except (OSError, ValueError):
+                # Unknown contents: keep every blob rather than break a revision
+                return removed_revisions, 0
+
+        removed_objects = 0
+        for root, _, files in os.walk(self.objects_path):
+            for name in files:
+                if name not in referenced:
+                    os.unlink(os.path.join(root, name))
+                    removed_objects += 1
+
+        return removed_revisions, removed_objects
+
+    def sync(self, source_dir, allow_empty=False):
+        """
+        Publish source_dir as the current revision
+        An empty source (e.g. a missing host directory bind-mounted as an
+        empty one) is refused unless allow_empty, since activating it would
+        empty /challenges in every running container at once
+        Returns a summary of what was copied and swapped
+        """
+        if not os.path.isdir(source_dir):
+            return {
+                'success': False,
+                'error': f'Challenge source {source_dir} does not exist'
+            }
+
+        os.makedirs(self.objects_path, exist_ok=True)
+        os.makedirs(self.revisions_path, exist_ok=True)
+
+        with open(os.path.join(self.store_path, self.LOCK_FILE), 'w') as lock:
+            # Serialize syncs from several API workers / CLI runs
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+            manifest, index = self._scan(source_dir, self._load_index())
+
+            if not manifest and not allow_empty:
+                logger.error(f"Refusing to publish empty challenge source {source_dir}")
+                return {
+                    'success': False,
+                    'error': f'Challenge source {source_dir} is empty; refusing to publish it',
+                    'revision': self.current_revision()
+                }
+
+            copied = 0
+            for rel_path, object_id in manifest.items():
+                if self._store_object(os.path.join(source_dir, rel_path), object_id):
+                    copied += 1
+
+            encoded = json.dumps(manifest, sort_keys=True).encode()
+            revision = hashlib.sha256(encoded).hexdigest()[:16]
+            previous = self.current_revision()
+
+            self._build_revision(revision, manifest)
+            if revision != previous:
+                self._activate(revision)
+                logger.info(f"Challenge files now at revision {revision} (was {previous})")
+
+            self._save_index(index)
+            removed_revisions, removed_objects = self._prune(revision)
+
+        return {
+            'success': True,
+            'revision': revision,
+            'previous_revision': previous,
+            'changed': revision != previous,
+            'files': len(manifest),
+            'copied': copied,
+            'removed_revisions': removed_revisions,
+            'removed_objects': removed_objects
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync challenge files into the shared store')
+    parser.add_argument('source', help='Challenge files directory')
+    parser.add_argument(
+        '--store',
+        default=os.environ.get('CHALLENGE_STORE_PATH', '/srv/challenges'),
+        help='Store root (the mounted challenge volume)'
+    )
+    parser.add_argument('--keep', type=int, default=3, help='Revisions to keep')
+    parser.add_argument(
+        '--allow-empty',
+        action='store_true',
+        help='Publish even if the source has no files (clears /challenges)'
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    result = ChallengeStore(args.store, keep_revisions=args.keep).sync(args.source, allow_empty=args.allow_empty)
+    print(json.dumps(result, indent=2))
+    return 0 if result['success'] else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -73,6 +73,12 @@ else
     docker-compose logs webshell-api
 fi
 
+# Publish challenge files to the shared volume
+echo "📂 Syncing challenge files..."
+set -a; . ./.env; set +a
+curl -fsS -X POST -H "X-API-Secret: $API_SECRET" \
+    http://localhost:5000/api/admin/challenges/sync || echo "❌ Challenge sync failed"
+
 echo ""
 echo "=================================="
 echo "🎉 Deployment complete!"
@@ -4,7 +4,12 @@ Handles container lifecycle: create, status, delete, cleanup
 """
 
 import docker
+import hashlib
+import ipaddress
+import itertools
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
 import json
 import os
@@ -23,6 +28,12 @@ class DockerManager:
     LABEL_USERNAME = 'webshell.username'
     LABEL_CREATED = 'webshell.created'
     LABEL_EXPIRES = 'webshell.expires'
+    LABEL_NETWORK_SHARD = 'webshell.network-shard'
+    CHALLENGE_MOUNT = '/srv/challenges'
+    PROXY_CHECK_INTERVAL = 30
+    # Docker's default address pools hold ~31 bridge subnets, some of which
+    # docker0 and the compose networks already use
+    DEFAULT_POOL_SHARD_LIMIT = 24
     
     def __init__(
         self,
@@ -31,48 +42,270 @@ class DockerManager:
         memory_limit='512m',
         cpu_limit=0.5,
         timeout_hours=24,
-        webshell_base_url='https://webshell.nullbytez.live'
+        webshell_base_url='https://webshell.nullbytez.live',
+        api_version='auto',
+        challenge_volume='webshell-challenges',
+        network_shards=1,
+        proxy_containers=(),
+        shard_subnet=None,
+        shard_prefix=24,
+        lazy=False
     ):
-        self.client = docker.from_env()
         self.network_name = network_name
         self.image_name = image_name
         self.memory_limit = memory_limit
         self.cpu_limit = cpu_limit
         self.timeout_hours = timeout_hours
         self.webshell_base_url = webshell_base_url
+        # 'auto' negotiates with the engine; pinning a version the engine
+        # supports skips that /version round trip on client construction
+        self.api_version = api_version
+        # Shared read-only volume holding the challenge store (see
+        # challenge_store.py); the image links /challenges into it
+        self.challenge_volume = challenge_volume
+        # Teams are spread over network_shards bridges; the reverse proxy
+        # containers are attached to each shard so routing by name still works
+        self.network_shards = max(int(network_shards), 1)
+        self.proxy_containers = tuple(proxy_containers)
+        # Optional address range carved into one subnet per shard, so shards
+        # do not draw from (and exhaust) the daemon's default address pools
+        self._shard_subnets = []
+        if self.network_shards > 1 and shard_subnet:
+            base = ipaddress.ip_network(shard_subnet)
+            self._shard_subnets = [
+                str(subnet) for subnet in
+                itertools.islice(base.subnets(new_prefix=shard_prefix), self.network_shards)
+            ]
+            if len(self._shard_subnets) < self.network_shards:
+                raise ValueError(
+                    f"{shard_subnet} only fits {len(self._shard_subnets)} /{shard_prefix} "
+                    f"subnets, need {self.network_shards} shards"
+                )
+        elif self.network_shards > self.DEFAULT_POOL_SHARD_LIMIT:
+            logger.warning(
+                f"{self.network_shards} network shards may exhaust Docker's default "
+                f"address pools; set a shard subnet or default-address-pools in daemon.json"
+            )
+        
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._ready_networks = set()
+        # proxy name -> container id last attached to every shard
+        self._proxy_ids = {}
+        self._proxy_checked = 0.0
         
-        # Ensure network exists
-        self._ensure_network()
+        if not lazy:
+            self.prepare()
     
-    def _ensure_network(self):
-        """Ensure the webshell network exists"""
+    @property
+    def client(self):
+        """Docker client, created on first use"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = docker.from_env(version=self.api_version)
+        return self._client
+    
+    def prepare(self):
+        """
+        Run one-time setup (network checks, API version negotiation) and
+        drop the client afterwards. Called from the gunicorn master before
+        forking so workers inherit the result (including the negotiated
+        version) without sharing the master's Docker connection pool
+        """
         try:
-            self.client.networks.get(self.network_name)
-            logger.info(f"Network {self.network_name} already exists")
-        except docker.errors.NotFound:
-            logger.info(f"Creating network {self.network_name}")
-            self.client.networks.create(
-                self.network_name,
-                driver='bridge'
+            self._setup()
+        except docker.errors.APIError as e:
+            if self.api_version == 'auto' or 'client version' not in str(e):
+                logger.warning(f"Docker setup deferred: {e}")
+                return
+            # Pinned version outside the engine's supported range (Engine 29+
+            # rejects anything below 1.44): negotiate instead of failing every call
+            logger.error(
+                f"Docker API version {self.api_version} rejected by the engine, "
+                f"falling back to negotiation: {e}"
             )
+            self.close()
+            self.api_version = 'auto'
+            try:
+                self._setup()
+            except Exception as e:
+                logger.warning(f"Docker setup deferred: {e}")
+        except Exception as e:
+            # Workers retry on first container create
+            logger.warning(f"Docker setup deferred: {e}")
+        finally:
+            self.close()
+    
+    def _setup(self):
+        self._ensure_network(self.network_name)
+        self._check_proxies(force=True)
+        if self.api_version == 'auto':
+            # Pin what the engine negotiated so forked workers skip /version
+            self.api_version = self.client.api.api_version
+            logger.info(f"Docker API version {self.api_version} negotiated, pinned for workers")
+    
+    def close(self):
+        """Close the Docker client; the next access reconnects"""
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+    
+    def get_network_name(self, team_name):
+        """
+        Network a team's container joins
+        Stable across processes and restarts (sha256, not hash())
+        """
+        if self.network_shards == 1:
+            return self.network_name
+        digest = hashlib.sha256(team_name.encode()).digest()
+        shard = int.from_bytes(digest[:8], 'big') % self.network_shards
+        return f"{self.network_name}-{shard}"
+    
+    def _ensure_network(self, network_name):
+        """Ensure a webshell network exists, creating shards on first use"""
+        if network_name in self._ready_networks:
+            return
+        
+        try:
+            network = self.client.networks.get(network_name)
+            logger.info(f"Network {network_name} already exists")
+        except docker.errors.NotFound:
+            logger.info(f"Creating network {network_name}")
+            labels = {}
+            ipam = None
+            if network_name != self.network_name:
+                labels[self.LABEL_NETWORK_SHARD] = self.network_name
+                if self._shard_subnets:
+                    shard = int(network_name.rsplit('-', 1)[1])
+                    ipam = docker.types.IPAMConfig(
+                        pool_configs=[docker.types.IPAMPool(subnet=self._shard_subnets[shard])]
+                    )
+            try:
+                network = self.client.networks.create(
+                    network_name,
+                    driver='bridge',
+                    check_duplicate=True,
+                    labels=labels,
+                    ipam=ipam
+                )
+            except docker.errors.APIError as e:
+                if 'fully subnetted' in str(e):
+                    logger.error(
+                        f"No address space left for {network_name}: lower "
+                        f"CONTAINER_NETWORK_SHARDS, set CONTAINER_NETWORK_SHARD_SUBNET "
+                        f"or extend default-address-pools in daemon.json"
+                    )
+                # Another worker created it first
+                if e.status_code != 409:
+                    raise
+                network = self.client.networks.get(network_name)
+        
+        if network_name != self.network_name:
+            self._attach_proxies(network)
+        self._ready_networks.add(network_name)
+    
+    def _attach_proxies(self, network):
+        """Connect the reverse proxy containers to a shard network"""
+        network.reload()
+        attached = network.attrs.get('Containers') or {}
+        
+        for proxy_name in self.proxy_containers:
+            try:
+                proxy = self.client.containers.get(proxy_name)
+            except docker.errors.NotFound:
+                logger.warning(f"Proxy container {proxy_name} not found")
+                continue
+            if proxy.id in attached:
+                continue
+            try:
+                network.connect(proxy)
+                logger.info(f"Attached {proxy_name} to {network.name}")
+            except docker.errors.APIError as e:
+                # Raced with another worker attaching the same proxy
+                if 'already exists' not in str(e):
+                    raise
+    
+    def _attach_proxies_to_shards(self):
+        """
+        Re-attach proxies to existing shards
+        A recreated proxy container only joins the compose-declared network
+        """
+        if self.network_shards == 1 or not self.proxy_containers:
+            return
+        shards = self.client.networks.list(
+            filters={'label': f'{self.LABEL_NETWORK_SHARD}={self.network_name}'}
+        )
+        for network in shards:
+            self._attach_proxies(network)
+    
+    def _check_proxies(self, force=False):
+        """
+        Re-attach proxies to all shards when a proxy container was recreated
+        (e.g. docker-compose up -d after a config change), detected by its
+        container id changing. Throttled to one check per PROXY_CHECK_INTERVAL
+        """
+        if self.network_shards == 1 or not self.proxy_containers:
+            return
+        now = time.monotonic()
+        if not force and now - self._proxy_checked < self.PROXY_CHECK_INTERVAL:
+            return
+        self._proxy_checked = now
+        
+        try:
+            current = {}
+            for proxy_name in self.proxy_containers:
+                try:
+                    current[proxy_name] = self.client.containers.get(proxy_name).id
+                except docker.errors.NotFound:
+                    continue
+            if current != self._proxy_ids:
+                self._attach_proxies_to_shards()
+                self._proxy_ids = current
+        except docker.errors.APIError as e:
+            logger.warning(f"Proxy attachment check failed: {e}")
     
     def _get_container_name(self, team_name):
         """Generate container name from team name"""
         return f"{self.CONTAINER_PREFIX}{team_name}"
     
+    def _is_webshell_container(self, container):
+        """
+        True only for containers this manager created: labelled with a team
+        and named exactly webshell-<team> (not e.g. webshell-api)
+        """
+        team_name = container.labels.get(self.LABEL_TEAM)
+        return bool(team_name) and container.name == self._get_container_name(team_name)
+    
+    def list_webshell_containers(self, all=True):
+        """
+        List team containers
+        Filters on the team label server-side, then on the exact name, since
+        Docker's name filter is a substring match
+        """
+        containers = self.client.containers.list(
+            all=all,
+            filters={'label': self.LABEL_TEAM}
+        )
+        return [c for c in containers if self._is_webshell_container(c)]
+    
     def _get_container(self, team_name):
         """Get container by team name, returns None if not found"""
         container_name = self._get_container_name(team_name)
         try:
-            return self.client.containers.get(container_name)
+            container = self.client.containers.get(container_name)
         except docker.errors.NotFound:
             return None
+        # A team called "api" must not resolve to the webshell-api service
+        return container if self._is_webshell_container(container) else None
     
     def get_container_status(self, team_name):
         """
         Get status of a team's container
         Returns dict with status info or None if no container
         """
+        self._check_proxies()
         container = self._get_container(team_name)
         
         if not container:
@@ -116,41 +349,69 @@ class DockerManager:
             }
         
         try:
+            network_name = self.get_network_name(team_name)
+            self._ensure_network(network_name)
+            self._check_proxies()
+            
             now = datetime.utcnow()
             expires = now + timedelta(hours=self.timeout_hours)
             
+            volumes = {}
+            if self.challenge_volume:
+                volumes[self.challenge_volume] = {
+                    'bind': self.CHALLENGE_MOUNT,
+                    'mode': 'ro'
+                }
+            
             # Create container with ttyd
-            container = self.client.containers.run(
-                self.image_name,
-                name=container_name,
-                detach=True,
-                network=self.network_name,
-                mem_limit=self.memory_limit,
-                cpu_quota=int(self.cpu_limit * 100000),
-                cpu_period=100000,
-                environment={
-                    'USERNAME': username,
-                    'TEAM_NAME': team_name
-                },
-                labels={
-                    self.LABEL_TEAM: team_name,
-                    self.LABEL_USERNAME: username,
-                    self.LABEL_CREATED: now.isoformat(),
-                    self.LABEL_EXPIRES: expires.isoformat()
-                },
-                restart_policy={'Name': 'unless-stopped'},
-                # Security options
-                cap_drop=['ALL'],
-                cap_add=['CHOWN', 'SETUID', 'SETGID', 'DAC_OVERRIDE', 'FOWNER'],
-                security_opt=['no-new-privileges:true'],
-                # Resource limits
-                pids_limit=100,
-                # Don't expose ports directly - use traefik/nginx reverse proxy
-            )
+            started = time.perf_counter()
+            for attempt in range(2):
+                try:
+                    container = self.client.containers.run(
+                        self.image_name,
+                        name=container_name,
+                        detach=True,
+                        network=network_name,
+                        mem_limit=self.memory_limit,
+                        cpu_quota=int(self.cpu_limit * 100000),
+                        cpu_period=100000,
+                        environment={
+                            'USERNAME': username,
+                            'TEAM_NAME': team_name
+                        },
+                        labels={
+                            self.LABEL_TEAM: team_name,
+                            self.LABEL_USERNAME: username,
+                            self.LABEL_CREATED: now.isoformat(),
+                            self.LABEL_EXPIRES: expires.isoformat()
+                        },
+                        volumes=volumes,
+                        restart_policy={'Name': 'unless-stopped'},
+                        # Security options
+                        cap_drop=['ALL'],
+                        cap_add=['CHOWN', 'SETUID', 'SETGID', 'DAC_OVERRIDE', 'FOWNER'],
+                        security_opt=['no-new-privileges:true'],
+                        # Resource limits
+                        pids_limit=100,
+                        # Don't expose ports directly - use traefik/nginx reverse proxy
+                    )
+                    break
+                except docker.errors.NotFound as e:
+                    # Shard network deleted (admin, prune) after this worker
+                    # cached it as ready: forget it, recreate once and retry
+                    if (attempt or isinstance(e, docker.errors.ImageNotFound)
+                            or 'network' not in str(e).lower()):
+                        raise
+                    logger.warning(f"Network {network_name} disappeared, recreating: {e}")
+                    self._ready_networks.discard(network_name)
+                    self._ensure_network(network_name)
             
             webshell_url = f"{self.webshell_base_url}/{team_name}"
             
-            logger.info(f"Created container {container_name} for team {team_name}")
+            logger.info(
+                f"Created container {container_name} for team {team_name} "
+                f"on {network_name} in {(time.perf_counter() - started) * 1000:.0f} ms"
+            )
             
             return {
                 'success': True,
@@ -191,7 +452,7 @@ class DockerManager:
         
         try:
             container.stop(timeout=10)
-            container.remove(force=force)
+            container.remove(v=True, force=force)
             logger.info(f"Deleted container for team {team_name}")
             return {
                 'success': True,
@@ -208,10 +469,7 @@ class DockerManager:
         """
         List all webshell containers
         """
-        containers = self.client.containers.list(
-            all=True,
-            filters={'name': self.CONTAINER_PREFIX}
-        )
+        containers = self.list_webshell_containers()
         
         result = []
         for container in containers:
@@ -232,10 +490,8 @@ class DockerManager:
         """
         Remove containers that have expired
         """
-        containers = self.client.containers.list(
-            all=True,
-            filters={'name': self.CONTAINER_PREFIX}
-        )
+        self._check_proxies(force=True)
+        containers = self.list_webshell_containers()
         
         now = datetime.utcnow()
         cleaned = []
@@ -254,7 +510,7 @@ class DockerManager:
                     team_name = container.labels.get(self.LABEL_TEAM, 'unknown')
                     try:
                         container.stop(timeout=10)
-                        container.remove(force=True)
+                        container.remove(v=True, force=True)
                         cleaned.append(team_name)
                         logger.info(f"Cleaned up expired container for team {team_name}")
                     except Exception as e:
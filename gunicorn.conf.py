@@ -0,0 +1,47 @@
+"""
+Gunicorn configuration for the Webshell API
+The app is preloaded in the master so workers fork with everything already
+imported, and Docker setup (network check) runs once instead of per worker
+"""
+
+import os
+import time
+
+from bulkhead import required_threads
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('GUNICORN_WORKERS', '4'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+preload_app = True
+
+# Threaded workers: request lanes (bulkhead.py) cap each endpoint class, and
+# every lane slot and queue entry gets its own thread plus spare threads for
+# /health, so a create storm cannot starve status checks
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', required_threads()))
+
+
+def when_ready(server):
+    """Master is up and the app is loaded: run one-time Docker setup"""
+    from app import docker_mgr, IMPORT_SECONDS
+
+    started = time.perf_counter()
+    docker_mgr.prepare()
+    server.log.info(
+        f"App import {IMPORT_SECONDS * 1000:.1f} ms, "
+        f"Docker setup {(time.perf_counter() - started) * 1000:.1f} ms"
+    )
+
+
+def pre_fork(server, worker):
+    worker.fork_started = time.perf_counter()
+
+
+def post_worker_init(worker):
+    """Log how long a worker took from fork to ready to serve"""
+    started = getattr(worker, 'fork_started', None)
+    if started is not None:
+        worker.log.info(
+            f"Worker {worker.pid} ready in "
+            f"{(time.perf_counter() - started) * 1000:.1f} ms"
+        )
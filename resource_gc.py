@@ -0,0 +1,224 @@
+"""
+Garbage Collector for Orphaned Webshell Resources
+Removes team containers that are no longer a live assignment (exited, dead,
+or created but never started) and their anonymous volumes, in small
+rate-limited batches so the Docker daemon is not flooded mid-event
+
+Volumes left dangling by a manual `docker rm` without -v are not collected:
+Docker keeps no link from a volume back to its removed container, so they
+cannot be told apart from other services' volumes
+"""
+
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+import docker
+
+logger = logging.getLogger(__name__)
+
+ANONYMOUS_VOLUME = re.compile(r'^[0-9a-f]{64}$')
+
+
+def _parse_docker_time(value):
+    """Parse Docker's RFC 3339 timestamps (nanoseconds, Z) to naive UTC"""
+    try:
+        return datetime.strptime(value[:19], '%Y-%m-%dT%H:%M:%S')
+    except (TypeError, ValueError):
+        return None
+
+
+class ResourceCollector:
+    """
+    Finds and removes orphaned webshell resources
+    Only containers DockerManager recognizes as its own are considered
+    """
+
+    # Running and restarting containers are live assignments
+    ORPHAN_STATES = ('created', 'exited', 'dead')
+
+    def __init__(
+        self,
+        docker_manager,
+        min_age_minutes=30,
+        batch_size=10,
+        batch_pause=1.0,
+        max_removals=100
+    ):
+        self.docker_manager = docker_manager
+        self.min_age = timedelta(minutes=min_age_minutes)
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.max_removals = max_removals
+
+        # Totals since this process started
+        self.total_removed = 0
+        self.total_reclaimed_bytes = 0
+        # One removal pass at a time per process (gthread workers can run
+        # two /api/admin/gc requests at once)
+        self._pass_lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self.docker_manager.client
+
+    def _orphan_reason(self, container, now):
+        """Return why a container is an orphan, or None if it is live"""
+        status = container.status
+        if status not in self.ORPHAN_STATES:
+            return None
+
+        state = container.attrs.get('State', {})
+        if status == 'created':
+            # Name reserved but never started
+            since = _parse_docker_time(container.attrs.get('Created'))
+        else:
+            since = _parse_docker_time(state.get('FinishedAt'))
+
+        if since and since.year > 1 and now - since < self.min_age:
+            # Give crash restarts and in-progress creates time to settle
+            return None
+        return f'{status} since {since.isoformat() if since else "unknown"}'
+
+    def _volume_sizes(self, names):
+        """
+        Disk usage of the given volumes
+        One /system/df call; only made when orphans actually have volumes
+        """
+        if not names:
+            return {}
+        usage = self.client.api.df().get('Volumes') or []
+        return {
+            volume['Name']: max((volume.get('UsageData') or {}).get('Size', 0), 0)
+            for volume in usage
+            if volume.get('Name') in names
+        }
+
+    def find_orphans(self):
+        """List orphaned team containers with their disk usage"""
+        now = datetime.utcnow()
+        orphans = []
+
+        for container in self.docker_manager.list_webshell_containers():
+            reason = self._orphan_reason(container, now)
+            if not reason:
+                continue
+
+            try:
+                details = self.client.api.inspect_container(container.id, size=True)
+            except docker.errors.NotFound:
+                continue
+
+            anonymous_volumes = [
+                mount['Name'] for mount in details.get('Mounts', [])
+                if mount.get('Type') == 'volume'
+                and ANONYMOUS_VOLUME.match(mount.get('Name', ''))
+            ]
+            orphans.append({
+                'container': container,
+                'name': container.name,
+                'team_name': container.labels.get(self.docker_manager.LABEL_TEAM, 'unknown'),
+                'reason': reason,
+                'size_bytes': details.get('SizeRw') or 0,
+                'anonymous_volumes': anonymous_volumes
+            })
+
+            if len(orphans) >= self.max_removals:
+                break
+
+        volume_sizes = self._volume_sizes(
+            {name for o in orphans for name in o['anonymous_volumes']}
+        )
+        for orphan in orphans:
+            orphan['volume_sizes'] = {
+                name: volume_sizes.get(name, 0) for name in orphan['anonymous_volumes']
+            }
+            orphan['volume_bytes'] = sum(orphan['volume_sizes'].values())
+
+        return orphans
+
+    def _remove_batch(self, batch, removed, volume_bytes, errors):
+        for orphan in batch:
+            try:
+                orphan['container'].remove(force=True)
+                removed.append(orphan)
+                logger.info(f"GC removed {orphan['name']} ({orphan['reason']})")
+            except docker.errors.NotFound:
+                # Already gone; its recorded volumes may still be dangling
+                pass
+            except docker.errors.APIError as e:
+                errors.append({'name': orphan['name'], 'error': str(e)})
+                continue
+
+            # Removed explicitly rather than with v=True so each one is
+            # accounted for (and an already-removed container still gets
+            # its recorded volumes cleaned up)
+            for volume_name in orphan['anonymous_volumes']:
+                try:
+                    self.client.api.remove_volume(volume_name)
+                    volume_bytes[volume_name] = orphan['volume_sizes'][volume_name]
+                except docker.errors.NotFound:
+                    continue
+                except docker.errors.APIError as e:
+                    # Still in use by another container
+                    errors.append({'name': volume_name, 'error': str(e)})
+
+    def collect(self, dry_run=False):
+        """
+        Run one GC pass
+        With dry_run, report what would be removed without touching anything
+        Returns success False if another pass is already running
+        """
+        if dry_run:
+            return self._collect(dry_run=True)
+
+        if not self._pass_lock.acquire(blocking=False):
+            return {
+                'success': False,
+                'error': 'A GC pass is already running'
+            }
+        try:
+            return self._collect(dry_run=False)
+        finally:
+            self._pass_lock.release()
+
+    def _collect(self, dry_run):
+        orphans = self.find_orphans()
+        report = [
+            {
+                key: orphan[key]
+                for key in ('name', 'team_name', 'reason', 'size_bytes', 'anonymous_volumes', 'volume_bytes')
+            }
+            for orphan in orphans
+        ]
+
+        if dry_run:
+            return {
+                'dry_run': True,
+                'orphans': report,
+                'reclaimable_bytes': sum(o['size_bytes'] + o['volume_bytes'] for o in orphans)
+            }
+
+        removed = []
+        volume_bytes = {}
+        errors = []
+        for start in range(0, len(orphans), self.batch_size):
+            if start:
+                time.sleep(self.batch_pause)
+            self._remove_batch(orphans[start:start + self.batch_size], removed, volume_bytes, errors)
+
+        reclaimed = sum(o['size_bytes'] for o in removed) + sum(volume_bytes.values())
+        self.total_removed += len(removed)
+        self.total_reclaimed_bytes += reclaimed
+
+        return {
+            'dry_run': False,
+            'removed': [o['name'] for o in removed],
+            'volumes_removed': list(volume_bytes),
+            'reclaimed_bytes': reclaimed,
+            'errors': errors,
+            'total_removed': self.total_removed,
+            'total_reclaimed_bytes': self.total_reclaimed_bytes
+        }
@@ -0,0 +1,112 @@
+"""
+Signed Session Tokens for the Webshell API
+/api/validate-token checks the CTFd token once and issues a short-lived
+HMAC-signed session token; later calls verify it locally with no CTFd I/O
+
+Token format: v1.<key id>.<base64url JSON claims>.<base64url HMAC-SHA256>
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def keys_from_env(session_keys, api_secret):
+    """
+    Parse signing keys
+    session_keys is "kid:secret,kid:secret"; the first key signs new tokens
+    and all of them verify, so a new key can be put first while tokens
+    signed with the old one expire. Without it, a key is derived from
+    api_secret so the admin secret itself never signs tokens. Raises
+    ValueError on a key id containing '.' or an empty secret
+    """
+    keys = []
+    for entry in (session_keys or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        kid, _, secret = entry.partition(':')
+        # '.' separates token fields, so such a key id could never verify
+        if not kid or '.' in kid:
+            raise ValueError(f"Invalid SESSION_KEYS key id {kid!r}: must be non-empty without '.'")
+        if not secret:
+            raise ValueError(f"SESSION_KEYS key {kid!r} has an empty secret")
+        keys.append((kid, secret.encode()))
+
+    if not keys:
+        derived = hmac.new(api_secret.encode(), b'webshell-session-v1', hashlib.sha256).digest()
+        keys.append(('default', derived))
+
+    return keys
+
+
+class SessionSigner:
+    """
+    Issues and verifies session tokens
+    Verification is a single HMAC over a few hundred bytes
+    """
+
+    VERSION = 'v1'
+
+    def __init__(self, keys, ttl_seconds=3600):
+        if not keys:
+            raise ValueError('At least one signing key is required')
+        self.active_kid, self._active_secret = keys[0]
+        self._keys = dict(keys)
+        self.ttl_seconds = ttl_seconds
+
+    def _sign(self, secret, signing_input):
+        return hmac.new(secret, signing_input.encode(), hashlib.sha256).digest()
+
+    def issue(self, user_id, team_id, team_name):
+        """
+        Create a token for a validated CTFd user
+        team_name must already be sanitized; returns (token, expires_at)
+        """
+        expires_at = int(time.time()) + self.ttl_seconds
+        claims = {
+            'uid': user_id,
+            'tid': team_id,
+            'team': team_name,
+            'exp': expires_at
+        }
+        payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode())
+        signing_input = f"{self.VERSION}.{self.active_kid}.{payload}"
+        signature = _b64encode(self._sign(self._active_secret, signing_input))
+        return f"{signing_input}.{signature}", expires_at
+
+    def verify(self, token):
+        """
+        Return the token's claims, or None if it is malformed, signed with
+        an unknown key, tampered with or expired
+        """
+        try:
+            version, kid, payload, signature = token.split('.')
+        except (AttributeError, ValueError):
+            return None
+
+        secret = self._keys.get(kid)
+        if version != self.VERSION or secret is None:
+            return None
+
+        expected = self._sign(secret, f"{version}.{kid}.{payload}")
+        try:
+            if not hmac.compare_digest(expected, _b64decode(signature)):
+                return None
+            claims = json.loads(_b64decode(payload))
+        except (ValueError, TypeError):
+            return None
+
+        if not isinstance(claims, dict) or claims.get('exp', 0) < time.time():
+            return None
+        return claims
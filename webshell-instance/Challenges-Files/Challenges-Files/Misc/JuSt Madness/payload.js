@@ -1 +0,0 @@
-console.log(function(t,e){let o="";for(let r=0;r<t.length;r++)o+=String.fromCharCode(t.charCodeAt(r)^e.charCodeAt(r%e.length));return o}("\0\0\x001'3\t\0D\n,GFA--AC*,FA\0","rsu"));
\ No newline at end of file